@@ -1,9 +1,13 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, joinedload
 
 import models
 from models import Topic, Question, Assessment, AssessmentQuestion
 from utils import normalize
 
+INSERT_BATCH_ROWS = 200  # 4 params per row; older SQLite caps a statement at 999
+
 
 def get_or_create_topic(db: Session, topic_name: str):
     topic_name = (topic_name or "").strip()
@@ -18,20 +22,20 @@ def get_or_create_topic(db: Session, topic_name: str):
 
 def add_question_if_not_exists(db: Session, topic_id: int, marks: int, question_text: str):
     normalized = normalize(question_text)
-    existing = db.query(Question).filter(
+    stmt = (
+        sqlite_insert(Question)
+        .values(topic_id=topic_id, marks=marks, question_text=normalized)
+        .on_conflict_do_nothing()
+    )
+    added = db.execute(stmt).rowcount == 1
+    db.commit()
+
+    q = db.query(Question).filter(
         Question.topic_id == topic_id,
         Question.marks == marks,
         Question.question_text == normalized
     ).first()
-
-    if existing:
-        return existing, False
-
-    new_q = Question(topic_id=topic_id, marks=marks, question_text=normalized)
-    db.add(new_q)
-    db.commit()
-    db.refresh(new_q)
-    return new_q, True
+    return q, added
 
 
 def create_assessment(db: Session, name: str):
@@ -49,7 +53,21 @@ def create_assessment(db: Session, name: str):
 def add_assessment_question(db: Session, assessment_id: int, topic_id: int, marks: int, question_text: str):
     norm = normalize(question_text)
 
-    existing = (
+    # atomic dedupe via the table's unique constraint
+    stmt = (
+        sqlite_insert(AssessmentQuestion)
+        .values(
+            assessment_id=assessment_id,
+            topic_id=topic_id,
+            marks=marks,
+            question_text=norm,
+        )
+        .on_conflict_do_nothing()
+    )
+    added = db.execute(stmt).rowcount == 1
+    db.commit()
+
+    aq = (
         db.query(AssessmentQuestion)
         .filter(
             AssessmentQuestion.assessment_id == assessment_id,
@@ -59,20 +77,50 @@ def add_assessment_question(db: Session, assessment_id: int, topic_id: int, mark
         )
         .first()
     )
+    return aq, added
 
-    if existing:
-        return existing, False
 
-    aq = AssessmentQuestion(
-        assessment_id=assessment_id,
-        topic_id=topic_id,
-        marks=marks,
-        question_text=norm,
+def add_assessment_questions_bulk(db: Session, assessment_id: int, items):
+    """
+    items: iterable of (topic_id, marks, question_text)
+    Skips questions already stored for this assessment (or repeated in items).
+    Returns number of rows saved.
+    """
+    existing = set(
+        db.query(
+            AssessmentQuestion.topic_id,
+            AssessmentQuestion.marks,
+            AssessmentQuestion.question_text,
+        )
+        .filter(AssessmentQuestion.assessment_id == assessment_id)
+        .all()
     )
-    db.add(aq)
-    db.commit()
-    db.refresh(aq)
-    return aq, True
+
+    rows = []
+    for topic_id, marks, question_text in items:
+        key = (topic_id, marks, normalize(question_text))
+        if key in existing:
+            continue
+        existing.add(key)
+        rows.append({
+            "assessment_id": assessment_id,
+            "topic_id": topic_id,
+            "marks": marks,
+            "question_text": key[2],
+        })
+
+    # multi-row INSERTs, chunked to stay under SQLite's bound-parameter limit
+    saved = 0
+    for i in range(0, len(rows), INSERT_BATCH_ROWS):
+        stmt = (
+            sqlite_insert(AssessmentQuestion)
+            .values(rows[i:i + INSERT_BATCH_ROWS])
+            .on_conflict_do_nothing()
+        )
+        saved += db.execute(stmt).rowcount
+    if rows:
+        db.commit()
+    return saved
 
 
 def get_all_previous_questions(db: Session):
@@ -82,14 +130,30 @@ def get_all_previous_questions(db: Session):
 
 def get_all_previous_questions_with_assessment(db: Session):
     """
-    Returns list of tuples: (question_text, assessment_name)
+    Yields tuples: (question_text, assessment_name)
+    question_text is already normalized, so it can be compared as-is.
+    Rows are streamed in batches, so consume before closing the session.
     """
     rows = (
         db.query(AssessmentQuestion.question_text, Assessment.name)
         .join(Assessment, Assessment.id == AssessmentQuestion.assessment_id)
-        .all()
+        .yield_per(1000)
+    )
+    for q, a in rows:
+        yield q, a
+
+
+def get_previous_questions_version(db: Session):
+    """
+    Cheap fingerprint of the previous-questions set: (row count, max id).
+    Changes whenever questions are imported or an assessment is deleted.
+    """
+    row = (
+        db.query(func.count(AssessmentQuestion.id), func.max(AssessmentQuestion.id))
+        .join(Assessment, Assessment.id == AssessmentQuestion.assessment_id)
+        .one()
     )
-    return [(q, a) for (q, a) in rows]
+    return tuple(row)
 
 
 def get_all_assessments(db: Session):
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -7,7 +7,54 @@ DB_PATH = os.path.join(BASE_DIR, "questions.db")
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+
+# create_all never touches tables that already exist, so indexes added to the
+# models after a DB was created are applied here (idempotent)
+_INDEX_MIGRATIONS = [
+    # (table, key columns, index name)
+    ("questions", "topic_id, marks, question_text", "uq_questions_topic_marks_text"),
+    ("assessment_questions", "assessment_id, topic_id, marks, question_text", "uq_assessment_questions_key"),
+]
+
+
+def ensure_unique_indexes(bind=engine):
+    """
+    Adds the dedupe unique indexes (and the assessment_id index) to databases
+    created before they existed, keeping the oldest row of any duplicates.
+    """
+    with bind.begin() as conn:
+        for table, cols, name in _INDEX_MIGRATIONS:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"), {"name": name}
+            ).first()
+            if exists:
+                continue
+            conn.execute(text(
+                f"DELETE FROM {table} WHERE id NOT IN "
+                f"(SELECT MIN(id) FROM {table} GROUP BY {cols})"
+            ))
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_assessment_questions_assessment_id "
+            "ON assessment_questions (assessment_id)"
+        ))
+
+
+def get_db():
+    """FastAPI dependency: one session per request, always closed."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,22 +1,37 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from typing import List, Dict, Optional
+from typing import BinaryIO, List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import numpy as np
 import pandas as pd
 import re
-import io
 import time
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process
 
 import utils
-from database import Base, engine, SessionLocal
+from database import Base, engine, get_db, ensure_unique_indexes
 import crud
 
+_WS_RE = re.compile(r"\s+")
+_MARKS_RE = re.compile(r"^\s*(\d+)\s*marks?\s*$")
+
+# cells that are headers/labels, never questions
+_JUNK_CELLS = {
+    "question", "questions", "answer", "answers",
+    "unit", "unit name", "topic",
+    "bloom", "blooms taxonomy", "bloom taxonomy",
+    "marks", "mark", "sl.no", "s.no", "sno"
+}
+_QUESTION_STARTERS = ("what", "why", "how", "define", "explain", "write", "list",
+                      "describe", "differentiate", "compare", "state", "give")
+
 # ============================================================
 # DB INIT
 # ============================================================
 Base.metadata.create_all(bind=engine)
+ensure_unique_indexes(engine)
 
 # ============================================================
 # APP INIT
@@ -58,88 +73,67 @@ def gs_retry(fn, max_tries: int = 5, base_sleep: float = 1.5):
 # ============================================================
 # UNIVERSAL CSV QUESTION EXTRACTOR
 # ============================================================
-def parse_any_csv_questions(content_bytes: bytes, dedupe: bool = True) -> List[Dict]:
+def parse_any_csv_questions(source: BinaryIO, dedupe: bool = True) -> List[Dict]:
     """
     Extracts question candidates from ANY CSV-like structure.
+    source is a binary file object (e.g. UploadFile.file), read in place.
 
     dedupe=True  -> remove duplicates (useful for import/master)
     dedupe=False -> keep duplicates (required for /check/new duplicate detection)
     """
     df = pd.read_csv(
-        io.BytesIO(content_bytes),
+        source,
         header=None,
         dtype=str,
         keep_default_na=False,
         on_bad_lines="skip",
-        engine="python"
+        engine="c"
     )
-    rows, cols = df.shape
+    arr = df.to_numpy(dtype=object, copy=False)
+    rows, cols = arr.shape
 
     def cell(r, c) -> str:
-        v = df.iat[r, c]
+        v = arr[r, c]
         return "" if v is None else str(v).strip()
 
     def norm(s: str) -> str:
-        return re.sub(r"\s+", " ", str(s).strip().lower())
-
-    def marks_from_text(s: str) -> Optional[int]:
-        m = re.match(r"^\s*(\d+)\s*marks?\s*$", norm(s))
-        if m:
-            return int(m.group(1))
-        return None
-
-    def question_confidence(text: str) -> float:
-        t = (text or "").strip()
-        if not t:
-            return 0.0
-
-        low = norm(t)
-
-        junk = {
-            "question", "questions", "answer", "answers",
-            "unit", "unit name", "topic",
-            "bloom", "blooms taxonomy", "bloom taxonomy",
-            "marks", "mark", "sl.no", "s.no", "sno"
-        }
-        if low in junk:
-            return 0.0
-
-        if len(low) < 8:
-            return 0.0
-
-        score = 0.2
-
-        if low.endswith("?"):
-            score += 0.4
-
-        starters = ("what", "why", "how", "define", "explain", "write", "list",
-                    "describe", "differentiate", "compare", "state", "give")
-        if low.startswith(starters):
-            score += 0.3
-
-        words = low.split()
-        if len(words) >= 6:
-            score += 0.2
-        if len(words) >= 10:
-            score += 0.1
-
-        digits = sum(ch.isdigit() for ch in low)
-        if digits > len(low) * 0.3:
-            score -= 0.3
-
-        return max(0.0, min(1.0, score))
-
-    # detect header rows containing "question"
-    header_rows = []
-    for r in range(min(rows, 120)):
-        row_vals = [norm(cell(r, c)) for c in range(cols)]
-        if any("question" in v for v in row_vals):
-            header_rows.append(r)
+        return _WS_RE.sub(" ", str(s).strip().lower())
+
+    # normalized copy of every cell, shared by header + marks detection
+    narr = np.vectorize(lambda v: "" if v is None else norm(v), otypes=[object])(arr)
+
+    # question confidence (0-1) of every cell, computed column-wise in one pass
+    flat = pd.Series(narr.ravel(), dtype=object)
+    lens = flat.str.len().to_numpy()
+    n_words = flat.str.split().str.len().to_numpy()
+    n_digits = flat.str.count(r"\d").to_numpy()
+
+    conf_arr = np.full(len(flat), 0.2)
+    conf_arr += np.where(flat.str.endswith("?").to_numpy(), 0.4, 0.0)
+    conf_arr += np.where(flat.str.startswith(_QUESTION_STARTERS).to_numpy(), 0.3, 0.0)
+    conf_arr += np.where(n_words >= 6, 0.2, 0.0)
+    conf_arr += np.where(n_words >= 10, 0.1, 0.0)
+    conf_arr -= np.where(n_digits > lens * 0.3, 0.3, 0.0)
+    conf_arr = np.clip(conf_arr, 0.0, 1.0)
+    conf_arr[flat.isin(_JUNK_CELLS).to_numpy() | (lens < 8)] = 0.0
+    conf_arr = conf_arr.reshape(rows, cols)
+
+    # "N marks" section cells (NaN elsewhere) and cells mentioning "question"
+    marks_arr = pd.to_numeric(flat.str.extract(_MARKS_RE.pattern, expand=False), errors="coerce")
+    marks_arr = marks_arr.to_numpy(dtype=float).reshape(rows, cols)
+    is_marks = ~np.isnan(marks_arr)
+    has_question = flat.str.contains("question", regex=False).to_numpy(dtype=bool).reshape(rows, cols)
+
+    def marks_label(v: float) -> str:
+        return "" if np.isnan(v) or not v else str(int(v))
+
+    # header row = first row (within the first 120) with the most "question" cells
+    q_counts = has_question[:120].sum(axis=1)
 
     blocks = []
-    if header_rows:
-        best = max(header_rows, key=lambda rr: sum("question" in norm(cell(rr, c)) for c in range(cols)))
-        hdr = [norm(cell(best, c)) for c in range(cols)]
+    if q_counts.any():
+        best = int(q_counts.argmax())
+        hdr = narr[best]
 
         for c in range(cols):
             if "question" in hdr[c]:
@@ -164,28 +158,31 @@ def parse_any_csv_questions(content_bytes: bytes, dedupe: bool = True) -> List[D
                 seen.add(b["q"])
         blocks = uniq
 
-    current_marks: Optional[int] = None
     out: List[Dict] = []
+    keys: List[str] = []    # normalized question per out row (dedupe key)
 
     if blocks:
-        for r in range(rows):
-            for c in range(cols):
-                mm = marks_from_text(cell(r, c))
-                if mm is not None:
-                    current_marks = mm
-                    break
+        # marks in force per row: first marks cell of the row, carried down
+        row_marks = np.where(
+            is_marks.any(axis=1),
+            marks_arr[np.arange(rows), is_marks.argmax(axis=1)],
+            np.nan,
+        )
+        current_marks = pd.Series(row_marks, dtype=float).ffill().to_numpy()
 
+        for r in range(rows):
             for b in blocks:
                 q = cell(r, b["q"])
-                conf = question_confidence(q)
+                conf = float(conf_arr[r, b["q"]])
                 if conf < 0.45:
                     continue
 
                 a = cell(r, b["a"]) if b["a"] is not None else ""
                 bloom = cell(r, b["b"]) if b["b"] is not None else ""
                 unit = cell(r, b["u"]) if b["u"] is not None else ""
-                marks_raw = cell(r, b["m"]) if b["m"] is not None else (str(current_marks) if current_marks else "")
+                marks_raw = cell(r, b["m"]) if b["m"] is not None else marks_label(current_marks[r])
 
+                keys.append(narr[r, b["q"]])
                 out.append({
                     "question": q,
                     "answer": a,
@@ -195,41 +192,30 @@ def parse_any_csv_questions(content_bytes: bytes, dedupe: bool = True) -> List[D
                     "confidence": conf
                 })
     else:
-        for r in range(rows):
-            for c in range(cols):
-                txt = cell(r, c)
-
-                mm = marks_from_text(txt)
-                if mm is not None:
-                    current_marks = mm
-                    continue
-
-                conf = question_confidence(txt)
-                if conf < 0.65:
-                    continue
-
-                out.append({
-                    "question": txt,
-                    "answer": "",
-                    "bloom": "",
-                    "unit": "",
-                    "marks_raw": str(current_marks) if current_marks else "",
-                    "confidence": conf
-                })
+        # marks in force per cell in reading order (row by row, left to right)
+        current_marks = pd.Series(marks_arr.ravel(), dtype=float).ffill().to_numpy().reshape(rows, cols)
+
+        for r, c in zip(*np.nonzero((conf_arr >= 0.65) & ~is_marks)):
+            keys.append(narr[r, c])
+            out.append({
+                "question": cell(r, c),
+                "answer": "",
+                "bloom": "",
+                "unit": "",
+                "marks_raw": marks_label(current_marks[r, c]),
+                "confidence": float(conf_arr[r, c])
+            })
 
     if not dedupe:
         return out
 
-    seen_q = set()
-    cleaned = []
-    for r in out:
-        key = re.sub(r"\s+", " ", r["question"].strip().lower())
-        if not key or key in seen_q:
-            continue
-        seen_q.add(key)
-        cleaned.append(r)
+    # keep the first row per normalized question
+    first: Dict[str, Dict] = {}
+    for key, r in zip(keys, out):
+        if key:
+            first.setdefault(key, r)
 
-    return cleaned
+    return list(first.values())
 
 
 # ============================================================
@@ -251,40 +237,78 @@ def band_label(score: float) -> str:
     return "low"
 
 
+# ============================================================
+# RESPONSE SHAPING
+# ============================================================
+def shape_details(details: List[Dict], orient: str = "records"):
+    """
+    "records": list of row dicts (default).
+    "columns": {column: [values]}, None where a row lacks the column;
+    lets the client build a DataFrame straight from column lists.
+    """
+    if orient != "columns":
+        return details
+    cols = {}
+    for d in details:
+        for k in d:
+            cols.setdefault(k, None)
+    return {k: [d.get(k) for d in details] for k in cols}
+
+
+# ============================================================
+# PREVIOUS QUESTIONS CACHE (for /check/new)
+# ============================================================
+# (version, [(question_text, assessment_name)], [normalized question],
+#  {normalized question: index of its first occurrence})
+_prev_cache = {"data": (None, [], [], {})}
+
+
+def get_previous_questions_cached(db: Session):
+    version = crud.get_previous_questions_version(db)
+    cached_version, pairs, norm, exact = _prev_cache["data"]
+    if version != cached_version:
+        pairs = list(crud.get_all_previous_questions_with_assessment(db))
+        # stored question_text is already normalized on insert
+        norm = [p for p, _ in pairs]
+        exact = {}
+        for i, q in enumerate(norm):
+            exact.setdefault(q, i)
+        _prev_cache["data"] = (version, pairs, norm, exact)
+    return pairs, norm, exact
+
+
+def invalidate_previous_questions_cache():
+    _prev_cache["data"] = (None, [], [], {})
+
+
 # ============================================================
 # IMPORT PREVIOUS ASSESSMENT
 # ============================================================
 @app.post("/import/assessment")
 async def import_assessment(
     assessment_name: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
 ):
-    db: Session = SessionLocal()
     assessment = crud.create_assessment(db, assessment_name)
 
-    content = await file.read()
-    extracted = parse_any_csv_questions(content, dedupe=True)
+    extracted = parse_any_csv_questions(file.file, dedupe=True)
 
     total_found = len(extracted)
-    total_saved = 0
 
+    topic_ids = {}  # unit name -> topic id
+    items = []
     for r in extracted:
         q_text = r["question"]
         marks = utils.normalize_marks(r.get("marks_raw", "")) or 0
         unit_name = (r.get("unit") or "").strip() or "Unknown Unit"
 
-        topic = crud.get_or_create_topic(db, unit_name)
-        _, added = crud.add_assessment_question(
-            db=db,
-            assessment_id=assessment.id,
-            topic_id=topic.id,
-            marks=marks,
-            question_text=q_text,
-        )
-        if added:
-            total_saved += 1
+        if unit_name not in topic_ids:
+            topic_ids[unit_name] = crud.get_or_create_topic(db, unit_name).id
+        items.append((topic_ids[unit_name], marks, q_text))
 
-    db.close()
+    total_saved = crud.add_assessment_questions_bulk(db, assessment.id, items)
+    invalidate_previous_questions_cache()
 
     return {
         "assessment_name": assessment_name,
@@ -302,11 +326,11 @@ async def import_assessment(
 async def check_new_assessment(
     file: UploadFile = File(...),
     assessment_name: str = Form(...),
+    details_orient: str = Form("records"),
+    db: Session = Depends(get_db),
 ):
-    content = await file.read()
-
     # keep duplicates for duplicate detection inside uploaded paper
-    new_rows = parse_any_csv_questions(content, dedupe=False)
+    new_rows = parse_any_csv_questions(file.file, dedupe=False)
 
     if not new_rows:
         return {"error": "No valid questions found in uploaded file."}
@@ -314,9 +338,11 @@ async def check_new_assessment(
     # Duplicate within uploaded paper
     seen = {}
     dup_flags: List[Dict] = []
+    new_norm: List[str] = []
     for r in new_rows:
         q = (r.get("question") or "").strip()
         key = utils.normalize(q)
+        new_norm.append(key)
         if key in seen:
             dup_flags.append({"duplicate": True, "duplicate_question": seen[key]})
         else:
@@ -325,25 +351,39 @@ async def check_new_assessment(
 
     dup_count = sum(1 for d in dup_flags if d["duplicate"])
 
-    db = SessionLocal()
-    prev_pairs = crud.get_all_previous_questions_with_assessment(db)
-    db.close()
+    prev_pairs, prev_norm, prev_exact = get_previous_questions_cached(db)
+
+    # exact repeats of a previous question resolve to 100 via hash lookup;
+    # the rest are scored once per distinct text
+    best_idx = np.zeros(len(new_norm), dtype=np.intp)
+    best_scores = np.zeros(len(new_norm), dtype=np.float32)
+    pending: Dict[str, List[int]] = {}  # normalized text -> row indices
+    for i, key in enumerate(new_norm):
+        j = prev_exact.get(key)
+        if j is not None:
+            best_idx[i] = j
+            best_scores[i] = 100.0
+        else:
+            pending.setdefault(key, []).append(i)
+
+    # best previous match per distinct pending text (cdist in bounded blocks);
+    # no cutoff: low scores still feed closest_previous_question and the overall mean
+    if pending and prev_norm:
+        top, top_scores = utils.best_matches(list(pending), prev_norm)
+        for k, row_ids in enumerate(pending.values()):
+            best_idx[row_ids] = top[k]
+            best_scores[row_ids] = top_scores[k]
 
     details = []
     for idx, r in enumerate(new_rows):
         q_new = r["question"]
         marks = utils.normalize_marks(r.get("marks_raw", ""))
 
-        best_score = 0.0
+        best_score = float(best_scores[idx])
         best_prev = ""
         best_assessment = ""
-
-        for prev_q, prev_assessment in prev_pairs:
-            score = utils.similarity_percentage(q_new, prev_q)
-            if score > best_score:
-                best_score = score
-                best_prev = prev_q
-                best_assessment = prev_assessment
+        if best_score > 0:
+            best_prev, best_assessment = prev_pairs[int(best_idx[idx])]
 
         category = classify_similarity(best_score)
         band = band_label(best_score)
@@ -373,7 +413,7 @@ async def check_new_assessment(
         "total_new_questions": len(details),
         "overall_similarity_percentage": round(overall, 1),
         "duplicates_within_uploaded_paper": dup_count,
-        "details": details
+        "details": shape_details(details, details_orient)
     }
 
 
@@ -385,9 +425,9 @@ async def check_against_master(
     file: UploadFile = File(...),
     master_sheet_url: str = Form(utils.MASTER_SHEET_URL_DEFAULT),
     master_tab_name: str = Form(utils.MASTER_TAB_DEFAULT),
+    details_orient: str = Form("records"),
 ):
-    content = await file.read()
-    extracted = parse_any_csv_questions(content, dedupe=True)
+    extracted = parse_any_csv_questions(file.file, dedupe=True)
 
     if not extracted:
         return {"error": "No valid questions found in uploaded file."}
@@ -398,6 +438,20 @@ async def check_against_master(
         return {"error": f"Failed reading master sheet: {repr(e)}"}
 
     unit_keys = list(unit_map.keys())
+    unit_keys_lower = [k.lower() for k in unit_keys]
+
+    # fuzzy match each distinct unit name to master keys once
+    unit_match = {}  # unit name -> (best_key, best_score)
+    for unit_name in {(item.get("unit") or "").strip() for item in extracted}:
+        if not unit_name:
+            continue
+        best_key = None
+        best_score = 0
+        res = process.extractOne(unit_name.lower(), unit_keys_lower, scorer=fuzz.ratio)
+        if res and res[1] > 0:
+            best_key = unit_keys[res[2]]
+            best_score = round(res[1])
+        unit_match[unit_name] = (best_key, best_score)
 
     results = []
     added_new = 0
@@ -406,21 +460,99 @@ async def check_against_master(
     unit_open_errors = 0
 
     unit_ss_cache = {}          # url -> spreadsheet
+    unit_ss_errors = {}         # url -> exception from opening the sheet
     unit_ws_cache = {}          # url -> {norm_title: worksheet}
-    unit_existing_cache = {}    # url -> list[str]
-    unit_header_cache = {}      # (url, marks) -> header
+    unit_existing_cache = {}    # url -> ([question], [clean_lower(question)])
+    unit_header_cache = {}      # (url, ws.id) -> header
+    unit_reframed_cache = {}    # url -> reframed worksheet (header == REFRAME_HEADER)
+    pending_writes = {}         # (url, ws.id) -> rows queued for one append_rows call
+    queued_src = {}             # (url, index in existing lists) -> results index of the queued question
+    dup_of_queued = {}          # results index of a skipped duplicate -> results index of the queued match
+
+    def queue_row(unit_sheet_url: str, ws, row: List[str], cat: str):
+        key = (unit_sheet_url, ws.id)
+        if key not in pending_writes:
+            pending_writes[key] = {"ws": ws, "category": cat, "rows": [], "result_idx": []}
+        pending_writes[key]["rows"].append(row)
+        pending_writes[key]["result_idx"].append(len(results))
+
+    def find_marks_ws(title_map: Dict, marks: int):
+        aliases = set(utils._norm_title(x) for x in utils.MARKS_TITLE_ALIASES.get(marks, []))
+        for a in aliases:
+            if a in title_map:
+                return title_map[a]
+        raise ValueError(f"Marks sheet for {marks} not found in unit sheet.")
 
     def get_marks_ws_from_cache(unit_sheet_url: str, unit_ss, marks: int):
         if unit_sheet_url not in unit_ws_cache:
             wss = gs_retry(lambda: unit_ss.worksheets())
             unit_ws_cache[unit_sheet_url] = {utils._norm_title(w.title): w for w in wss}
 
-        title_map = unit_ws_cache[unit_sheet_url]
-        aliases = set(utils._norm_title(x) for x in utils.MARKS_TITLE_ALIASES.get(marks, []))
-        for a in aliases:
-            if a in title_map:
-                return title_map[a]
-        raise ValueError(f"Marks sheet for {marks} not found in unit sheet.")
+        return find_marks_ws(unit_ws_cache[unit_sheet_url], marks)
+
+    def load_existing(unit_ss, title_map: Dict):
+        # all marks tabs + reframed tab in one batchGet
+        tabs = []
+        for mk in (2, 4, 8, 16):
+            try:
+                tabs.append(find_marks_ws(title_map, mk))
+            except Exception:
+                pass
+        tabs.extend(w for w in title_map.values() if w.title == utils.REFRAME_SHEET_NAME)
+
+        try:
+            fetched = gs_retry(lambda: utils.fetch_sheets(unit_ss, [w.title for w in tabs]))
+        except Exception:
+            fetched = []
+
+        # headers come with the data, so appends need no extra header reads
+        existing_raw, existing_norm = [], []
+        headers = {}
+        for ws, (ws_header, ws_rows) in zip(tabs, fetched):
+            for raw, norm in utils.questions_from_rows(ws_header, ws_rows):
+                existing_raw.append(raw)
+                existing_norm.append(norm)
+            headers[ws.id] = ws_header
+        return (existing_raw, existing_norm), headers
+
+    def prefetch_unit(unit_sheet_url: str):
+        unit_ss = gs_retry(lambda: utils.open_sheet_by_url(unit_sheet_url))
+        try:
+            wss = gs_retry(lambda: unit_ss.worksheets())
+        except Exception:
+            return unit_ss, None, None  # the item loop retries and reports it
+        title_map = {utils._norm_title(w.title): w for w in wss}
+        return unit_ss, title_map, load_existing(unit_ss, title_map)
+
+    # open every unit sheet we will touch and read its existing questions up front,
+    # 8 sheets at a time (independent HTTP round trips)
+    needed_urls = set()
+    for item in extracted:
+        unit_name = (item.get("unit") or "").strip()
+        if not (item.get("question") or "").strip() or not unit_name:
+            continue
+        if utils.normalize_marks(item.get("marks_raw", "")) not in (2, 4, 8, 16):
+            continue
+        best_key, best_score = unit_match[unit_name]
+        if best_key and best_score >= 80:
+            needed_urls.add(unit_map[best_key])
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        futures = {ex.submit(prefetch_unit, url): url for url in needed_urls}
+        for fut in as_completed(futures):
+            url = futures[fut]
+            try:
+                unit_ss, title_map, existing = fut.result()
+            except Exception as e:
+                unit_ss_errors[url] = e
+                continue
+            unit_ss_cache[url] = unit_ss
+            if title_map is not None:
+                unit_ws_cache[url] = title_map
+                existing_questions, headers = existing
+                unit_existing_cache[url] = existing_questions
+                for ws_id, ws_header in headers.items():
+                    unit_header_cache[(url, ws_id)] = ws_header
 
     for item in extracted:
         q = (item.get("question") or "").strip()
@@ -438,15 +570,7 @@ async def check_against_master(
             results.append({"question": q, "unit": unit_name, "marks": marks, "status": "error", "message": "Marks not 2/4/8/16"})
             continue
 
-        # fuzzy match unit name to master keys
-        best_key = None
-        best_score = 0
-        for k in unit_keys:
-            sc = fuzz.ratio(unit_name.lower(), k.lower())
-            if sc > best_score:
-                best_score = sc
-                best_key = k
-
+        best_key, best_score = unit_match[unit_name]
         if not best_key or best_score < 80:
             results.append({"question": q, "unit": unit_name, "marks": marks, "status": "error",
                             "message": f"Unit not found (best={best_key}, score={best_score})"})
@@ -455,6 +579,8 @@ async def check_against_master(
         unit_sheet_url = unit_map[best_key]
 
         try:
+            if unit_sheet_url in unit_ss_errors:
+                raise unit_ss_errors[unit_sheet_url]
             if unit_sheet_url not in unit_ss_cache:
                 unit_ss_cache[unit_sheet_url] = gs_retry(lambda: utils.open_sheet_by_url(unit_sheet_url))
             unit_ss = unit_ss_cache[unit_sheet_url]
@@ -471,44 +597,37 @@ async def check_against_master(
                             "message": f"Marks worksheet missing: {repr(e)}"})
             continue
 
-        # cache existing questions once per unit sheet
+        # cache existing questions once per unit sheet (normally already prefetched)
         if unit_sheet_url not in unit_existing_cache:
-            existing_questions = []
-            for mk in (2, 4, 8, 16):
-                try:
-                    ws = get_marks_ws_from_cache(unit_sheet_url, unit_ss, mk)
-                    existing_questions.extend(gs_retry(lambda ws=ws: utils.read_questions_from_ws(ws)))
-                except Exception:
-                    pass
-
-            try:
-                rws_existing = gs_retry(lambda: unit_ss.worksheet(utils.REFRAME_SHEET_NAME))
-                existing_questions.extend(gs_retry(lambda: utils.read_questions_from_ws(rws_existing)))
-            except Exception:
-                pass
-
+            existing_questions, headers = load_existing(unit_ss, unit_ws_cache[unit_sheet_url])
+            for ws_id, ws_header in headers.items():
+                unit_header_cache[(unit_sheet_url, ws_id)] = ws_header
             unit_existing_cache[unit_sheet_url] = existing_questions
 
-        existing_questions = unit_existing_cache[unit_sheet_url]
+        existing_raw, existing_norm = unit_existing_cache[unit_sheet_url]
 
+        # one C-level scan over the pre-normalized questions (fuzz.ratio on clean_lower text)
+        q_norm = utils.clean_lower(q)
         best_sim = 0.0
         best_match_q = ""
-        for prev in existing_questions:
-            sc = utils.similarity_percentage(q, prev)
-            if sc > best_sim:
-                best_sim = sc
-                best_match_q = prev
+        res = process.extractOne(q_norm, existing_norm, scorer=fuzz.ratio)
+        if res and res[1] > 0:
+            best_sim = res[1]
+            best_match_q = existing_raw[res[2]]
 
         cat = classify_similarity(best_sim)
         band = band_label(best_sim)
 
         if cat == "duplicate":
+            if res and (unit_sheet_url, res[2]) in queued_src:
+                # matched a row that is only queued; revisited if its write fails
+                dup_of_queued[len(results)] = queued_src[(unit_sheet_url, res[2])]
             skipped += 1
             results.append({"question": q, "unit": best_key, "marks": marks, "similarity_percentage": round(best_sim, 2),
                             "band": band, "category": cat, "action": "skipped", "closest_question": best_match_q})
             continue
 
-        header_key = (unit_sheet_url, marks)
+        header_key = (unit_sheet_url, marks_ws.id)
         if header_key not in unit_header_cache:
             unit_header_cache[header_key] = gs_retry(lambda: utils.get_header(marks_ws))
         header = unit_header_cache[header_key]
@@ -516,28 +635,61 @@ async def check_against_master(
         row_to_write = utils.build_row_for_append(header, item)
 
         if cat == "new":
-            try:
-                gs_retry(lambda: marks_ws.append_row(row_to_write))
-                added_new += 1
-                unit_existing_cache[unit_sheet_url].append(q)
-                results.append({"question": q, "unit": best_key, "marks": marks, "similarity_percentage": round(best_sim, 2),
-                                "band": band, "category": cat, "action": f"added_to_{marks}_marks", "closest_question": best_match_q})
-            except Exception as e:
-                results.append({"question": q, "unit": best_key, "marks": marks, "status": "error",
-                                "message": f"Append failed: {repr(e)}"})
+            queue_row(unit_sheet_url, marks_ws, row_to_write, cat)
+            added_new += 1
+            queued_src[(unit_sheet_url, len(existing_raw))] = len(results)
+            existing_raw.append(q)
+            existing_norm.append(q_norm)
+            results.append({"question": q, "unit": best_key, "marks": marks, "similarity_percentage": round(best_sim, 2),
+                            "band": band, "category": cat, "action": f"added_to_{marks}_marks", "closest_question": best_match_q})
 
         elif cat == "reframed":
             try:
-                rws = gs_retry(lambda: utils.get_or_create_reframed_sheet(unit_ss))
-                rws_header = gs_retry(lambda: utils.get_header(rws))
-                gs_retry(lambda: rws.append_row(utils.build_row_for_append(rws_header, item)))
-                added_reframed += 1
-                unit_existing_cache[unit_sheet_url].append(q)
-                results.append({"question": q, "unit": best_key, "marks": marks, "similarity_percentage": round(best_sim, 2),
-                                "band": band, "category": cat, "action": "added_to_reframed_questions", "closest_question": best_match_q})
+                if unit_sheet_url not in unit_reframed_cache:
+                    known_header = next((unit_header_cache.get((unit_sheet_url, w.id))
+                                         for w in unit_ws_cache[unit_sheet_url].values()
+                                         if w.title == utils.REFRAME_SHEET_NAME), None)
+                    unit_reframed_cache[unit_sheet_url] = gs_retry(
+                        lambda: utils.get_or_create_reframed_sheet(unit_ss, known_header))
+                rws = unit_reframed_cache[unit_sheet_url]
             except Exception as e:
                 results.append({"question": q, "unit": best_key, "marks": marks, "status": "error",
                                 "message": f"Reframed append failed: {repr(e)}"})
+                continue
+
+            queue_row(unit_sheet_url, rws, utils.build_row_for_append(utils.REFRAME_HEADER, item), cat)
+            added_reframed += 1
+            queued_src[(unit_sheet_url, len(existing_raw))] = len(results)
+            existing_raw.append(q)
+            existing_norm.append(q_norm)
+            results.append({"question": q, "unit": best_key, "marks": marks, "similarity_percentage": round(best_sim, 2),
+                            "band": band, "category": cat, "action": "added_to_reframed_questions", "closest_question": best_match_q})
+
+    # flush queued rows: one append request per worksheet
+    failed_writes = {}  # results index -> error message
+    for pw in pending_writes.values():
+        try:
+            gs_retry(lambda pw=pw: pw["ws"].append_rows(pw["rows"], insert_data_option="INSERT_ROWS"))
+        except Exception as e:
+            prefix = "Append failed" if pw["category"] == "new" else "Reframed append failed"
+            for i in pw["result_idx"]:
+                r = results[i]
+                results[i] = {"question": r["question"], "unit": r["unit"], "marks": r["marks"], "status": "error",
+                              "message": f"{prefix}: {repr(e)}"}
+                failed_writes[i] = results[i]["message"]
+            if pw["category"] == "new":
+                added_new -= len(pw["result_idx"])
+            else:
+                added_reframed -= len(pw["result_idx"])
+
+    # duplicates of a question that never reached the sheet were not really covered
+    for i, src in dup_of_queued.items():
+        if src in failed_writes:
+            r = results[i]
+            results[i] = {"question": r["question"], "unit": r["unit"], "marks": r["marks"], "status": "error",
+                          "message": f"Duplicate of '{r['closest_question']}', which was not written "
+                                     f"({failed_writes[src]})"}
+            skipped -= 1
 
     return {
         "master_sheet_url": master_sheet_url,
@@ -547,7 +699,7 @@ async def check_against_master(
         "added_reframed": added_reframed,
         "skipped_duplicates": skipped,
         "unit_open_errors": unit_open_errors,
-        "details": results,
+        "details": shape_details(results, details_orient),
     }
 
 
@@ -555,23 +707,18 @@ async def check_against_master(
 # ASSESSMENTS LIST + DETAILS + DELETE
 # ============================================================
 @app.get("/assessments")
-def list_assessments():
-    db = SessionLocal()
+def list_assessments(db: Session = Depends(get_db)):
     assessments = crud.get_all_assessments(db)
-    db.close()
     return [{"id": a.id, "name": a.name} for a in assessments]
 
 
 @app.get("/assessments/{assessment_id}")
-def get_assessment_details(assessment_id: int):
-    db = SessionLocal()
+def get_assessment_details(assessment_id: int, db: Session = Depends(get_db)):
     assessment = crud.get_assessment_by_id(db, assessment_id)
     if not assessment:
-        db.close()
         return {"error": "Assessment not found"}
 
     questions = crud.get_questions_by_assessment(db, assessment_id)
-    db.close()
 
     return {
         "assessment_id": assessment.id,
@@ -588,10 +735,9 @@ def get_assessment_details(assessment_id: int):
 
 
 @app.delete("/assessments/{assessment_id}")
-def delete_assessment(assessment_id: int):
-    db = SessionLocal()
+def delete_assessment(assessment_id: int, db: Session = Depends(get_db)):
     ok = crud.delete_assessment(db, assessment_id)
-    db.close()
+    invalidate_previous_questions_cache()
     if ok:
         return {"message": "Assessment deleted"}
     return {"error": "Assessment not found"}
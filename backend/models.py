@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -26,6 +26,8 @@ class Topic(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    # named unique index (not a table constraint) so ensure_unique_indexes can add it to old DBs
+    __table_args__ = (Index("uq_questions_topic_marks_text", "topic_id", "marks", "question_text", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     topic_id = Column(Integer, ForeignKey("topics.id"))
@@ -56,14 +58,17 @@ class Assessment(Base):
 
 class AssessmentQuestion(Base):
     __tablename__ = "assessment_questions"
+    __table_args__ = (
+        Index("uq_assessment_questions_key", "assessment_id", "topic_id", "marks", "question_text", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
-    assessment_id = Column(Integer, ForeignKey("assessments.id"))
+    assessment_id = Column(Integer, ForeignKey("assessments.id"), index=True)
     topic_id = Column(Integer, ForeignKey("topics.id"))
 
     marks = Column(Integer, index=True)
-    question_text = Column(Text, index=True)
+    question_text = Column(Text, index=True)  # stored as utils.normalize(text)
 
     # Relationships
     assessment = relationship("Assessment", back_populates="questions")
@@ -1,9 +1,13 @@
 import re
-import difflib
 import os
+import time
+import functools
 from typing import List, Dict, Optional, Tuple, Any
 
+import numpy as np
 import gspread
+from gspread.utils import absolute_range_name, ValueRenderOption, DateTimeOption
+from rapidfuzz import fuzz, process
 from google.oauth2.service_account import Credentials
 
 # =========================
@@ -22,6 +26,43 @@ MASTER_TAB_DEFAULT = "Programming Foundations Descriptive"
 
 REFRAME_SHEET_NAME = "Reframed Questions"
 REFRAME_HEADER = ["Question", "Answer", "Bloom's Taxonomy Level"]
+_Q_HEADER_VALUES = {"question", "questions"}
+
+_WS_RE = re.compile(r"\s+")
+_MARKS_NUM_RE = re.compile(r"\b(2|4|8|16)\b")
+_NORM_RE = re.compile(r"[^a-z0-9]")
+
+# read raw cell values (smaller payload, no server-side number formatting);
+# dates still come back as display strings
+RAW_VALUE_PARAMS = {
+    "valueRenderOption": ValueRenderOption.unformatted.value,
+    "dateTimeRenderOption": DateTimeOption.formatted_string.value,
+}
+
+
+# =========================
+# CACHING
+# =========================
+def ttl_cache(seconds: float):
+    """
+    Memoizes results per positional args for `seconds`. Errors are not cached.
+    """
+    def decorator(fn):
+        store: Dict[Tuple, Tuple[float, Any]] = {}
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            hit = store.get(args)
+            if hit and hit[0] > now:
+                return hit[1]
+            value = fn(*args)
+            store[args] = (now + seconds, value)
+            return value
+
+        wrapper.cache_clear = store.clear
+        return wrapper
+    return decorator
 
 
 # =========================
@@ -30,36 +71,56 @@ REFRAME_HEADER = ["Question", "Answer", "Bloom's Taxonomy Level"]
 def normalize(text: str) -> str:
     s = "" if text is None else str(text)
     s = s.strip().lower()
-    return re.sub(r"\s+", " ", s)
+    return _WS_RE.sub(" ", s)
 
 
+@functools.lru_cache(maxsize=8192, typed=True)  # headers, unit names and questions repeat across calls
 def clean_text(text: Any) -> str:
     if text is None:
         return ""
-    return re.sub(r"\s+", " ", str(text).strip())
+    return _WS_RE.sub(" ", str(text).strip())
 
 
+@functools.lru_cache(maxsize=8192, typed=True)  # typed: True/1/1.0 are different cells
 def clean_lower(text: Any) -> str:
     return clean_text(text).lower()
 
 
-def similarity_percentage(a: str, b: str) -> float:
-    a = clean_lower(a)
-    b = clean_lower(b)
-    if not a or not b:
-        return 0.0
-    return difflib.SequenceMatcher(None, a, b).ratio() * 100.0
+SIMILARITY_BLOCK_ROWS = 256  # queries scored per cdist call; caps the matrix at 256 x len(choices)
 
 
-def best_fuzzy_match(target: str, options: List[str]) -> Tuple[str, float]:
-    best = ""
-    best_score = 0.0
-    for opt in options:
-        sc = similarity_percentage(target, opt)
-        if sc > best_score:
-            best_score = sc
-            best = opt
-    return best, best_score
+def best_matches(queries: List[str], choices: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Best choice for every query: (index into choices, 0-100 percentage) arrays.
+    Both lists must already be normalize()d and choices must be non-empty.
+    Scored block by block so only one (block x len(choices)) matrix is alive at a time.
+    """
+    best_idx = np.zeros(len(queries), dtype=np.intp)
+    best_scores = np.zeros(len(queries), dtype=np.float32)
+    for start in range(0, len(queries), SIMILARITY_BLOCK_ROWS):
+        scores = process.cdist(
+            queries[start:start + SIMILARITY_BLOCK_ROWS],
+            choices,
+            scorer=fuzz.ratio,
+            dtype=np.float32,
+            workers=-1,  # all cores; the C scorer releases the GIL
+        )
+        top = scores.argmax(axis=1)
+        best_idx[start:start + len(top)] = top
+        best_scores[start:start + len(top)] = scores[np.arange(len(top)), top]
+    return best_idx, best_scores
+
+
+def best_fuzzy_match(target: str, options: List[str], score_cutoff: float = 0) -> Tuple[str, float]:
+    """
+    Best option by fuzz.ratio on clean_lower'd strings; ("", 0.0) if none scores above 0 / score_cutoff.
+    """
+    res = process.extractOne(
+        target, options, scorer=fuzz.ratio, processor=clean_lower, score_cutoff=score_cutoff
+    )
+    if res is None or res[1] <= 0:
+        return "", 0.0
+    return res[0], res[1]
 
 
 # =========================
@@ -69,7 +130,7 @@ def normalize_marks(raw) -> Optional[int]:
     if raw is None:
         return None
     t = clean_lower(raw)
-    m = re.search(r"\b(2|4|8|16)\b", t)
+    m = _MARKS_NUM_RE.search(t)
     if m:
         return int(m.group(1))
     words = {"two": 2, "four": 4, "eight": 8, "sixteen": 16}
@@ -82,6 +143,7 @@ def normalize_marks(raw) -> Optional[int]:
 # =========================
 # GOOGLE SHEETS AUTH
 # =========================
+@functools.lru_cache(maxsize=1)
 def get_gspread_client():
     print("SERVICE_ACCOUNT_FILE =", SERVICE_ACCOUNT_FILE)
     if not os.path.exists(SERVICE_ACCOUNT_FILE):
@@ -98,6 +160,7 @@ def extract_spreadsheet_id(url: str) -> str:
     return m.group(1)
 
 
+@ttl_cache(600)
 def open_sheet_by_url(url: str):
     ss_id = extract_spreadsheet_id(url)
     client = get_gspread_client()
@@ -110,28 +173,50 @@ def open_sheet_by_url(url: str):
 # =========================
 # MASTER LOOKUP (Topic -> Sheet link)
 # =========================
+_TAB_TITLES_CACHE: Dict[str, List[str]] = {}  # spreadsheet id -> tab titles
+
+
+def _resolve_tab_title(ss, spreadsheet_id: str, tab_name: str) -> str:
+    if spreadsheet_id not in _TAB_TITLES_CACHE:
+        _TAB_TITLES_CACHE[spreadsheet_id] = [w.title for w in ss.worksheets()]
+    titles = _TAB_TITLES_CACHE[spreadsheet_id]
+
+    wanted = clean_lower(tab_name).strip()
+    titles_lower = [clean_lower(t).strip() for t in titles]
+
+    if wanted in titles_lower:
+        return titles[titles_lower.index(wanted)]
+
+    # fuzz.ratio <= 200*min(len) / (sum of lens), so titles too far off in length can't reach 70
+    wanted_len = len(wanted)
+    candidates = [t for t in titles_lower if 200 * min(len(t), wanted_len) >= 70 * (len(t) + wanted_len)]
+    best_title, best_score = best_fuzzy_match(wanted, candidates, score_cutoff=70)
+    if best_score < 70:
+        _TAB_TITLES_CACHE.pop(spreadsheet_id, None)  # re-list next time; the tab may be added/renamed
+        raise ValueError(
+            f"Master tab not found. Requested='{tab_name}'. Available tabs={titles}"
+        )
+    return titles[titles_lower.index(best_title)]
+
+
+@ttl_cache(120)
 def build_unit_map_from_master(master_url: str, tab_name: str) -> Dict[str, str]:
     ss = open_sheet_by_url(master_url)
+    ss_id = extract_spreadsheet_id(master_url)
 
+    # one values.get on the tab by name; only resolve the title on a miss
     try:
-        ws = ss.worksheet(tab_name)
-    except Exception:
-        wanted = clean_lower(tab_name).strip()
-        titles = [w.title for w in ss.worksheets()]
-        titles_lower = [clean_lower(t).strip() for t in titles]
-
-        if wanted in titles_lower:
-            ws = ss.worksheet(titles[titles_lower.index(wanted)])
-        else:
-            best_title, best_score = best_fuzzy_match(wanted, titles_lower)
-            if best_score < 70:
-                raise ValueError(
-                    f"Master tab not found. Requested='{tab_name}'. Available tabs={titles}"
-                )
-            real_title = titles[titles_lower.index(best_title)]
-            ws = ss.worksheet(real_title)
-
-    values = ws.get_all_values()
+        values = ss.values_get(absolute_range_name(tab_name), params=RAW_VALUE_PARAMS).get("values", [])
+    except gspread.exceptions.APIError as e:
+        if e.code != 400:  # only "Unable to parse range" means a wrong tab name; let 429s reach gs_retry
+            raise
+        real_title = _resolve_tab_title(ss, ss_id, tab_name)
+        try:
+            values = ss.values_get(absolute_range_name(real_title), params=RAW_VALUE_PARAMS).get("values", [])
+        except Exception:
+            _TAB_TITLES_CACHE.pop(ss_id, None)  # tabs may have been renamed
+            raise
+
     if not values or len(values) < 2:
         raise ValueError("Master sheet tab is empty or not readable.")
 
@@ -147,13 +232,17 @@ def build_unit_map_from_master(master_url: str, tab_name: str) -> Dict[str, str]
     link_i = idx("Sheet link")
 
     unit_map: Dict[str, str] = {}
+    max_i = max(topic_i, link_i)
     for row in values[1:]:
-        if len(row) <= max(topic_i, link_i):
+        if len(row) <= max_i:
+            continue
+        # cheap link test first: most rows are not unit links
+        raw_link = row[link_i]
+        if not isinstance(raw_link, str) or not raw_link.lstrip().startswith("http"):
             continue
         topic = clean_text(row[topic_i])
-        link = clean_text(row[link_i])
-        if topic and link.startswith("http"):
-            unit_map[topic] = link
+        if topic:
+            unit_map[topic] = clean_text(raw_link)
 
     if not unit_map:
         raise ValueError("No unit mappings found (Topic / Sheet link).")
@@ -164,8 +253,9 @@ def build_unit_map_from_master(master_url: str, tab_name: str) -> Dict[str, str]
 # =========================
 # UNIT SHEET HELPERS
 # =========================
+@functools.lru_cache(maxsize=1024)
 def _norm_title(t: str) -> str:
-    return re.sub(r"[^a-z0-9]", "", clean_lower(t))
+    return _NORM_RE.sub("", clean_lower(t))
 
 
 MARKS_TITLE_ALIASES = {
@@ -189,79 +279,115 @@ def get_header(ws) -> List[str]:
 
 
 def find_question_col_index(header: List[str]) -> int:
-    lowered = [clean_lower(h) for h in header]
-    if "question" in lowered:
-        return lowered.index("question")
-    for i, h in enumerate(lowered):
-        if "question" in h:
+    # exact "question" wins; else first header containing it; else column 0
+    partial = -1
+    for i, h in enumerate(header):
+        hl = clean_lower(h)
+        if hl == "question":
             return i
-    return 0
+        if partial < 0 and "question" in hl:
+            partial = i
+    return partial if partial >= 0 else 0
 
 
-def read_questions_from_ws(ws) -> List[str]:
-    values = ws.get_all_values()
-    if not values or len(values) < 2:
+def split_header(values: List[List[Any]]) -> Tuple[List[str], List[List[Any]]]:
+    if not values:
+        return [], []
+    return [clean_text(x) for x in values[0]], values[1:]
+
+
+def fetch_sheets(unit_spreadsheet, titles: List[str]) -> List[Tuple[List[str], List[List[Any]]]]:
+    """
+    (cleaned header, data rows) for several tabs with one values.batchGet request
+    (same order as titles).
+    """
+    if not titles:
         return []
+    resp = unit_spreadsheet.values_batch_get(
+        [absolute_range_name(t) for t in titles], params=RAW_VALUE_PARAMS
+    )
+    return [split_header(vr.get("values", [])) for vr in resp.get("valueRanges", [])]
+
+
+def questions_from_rows(header: List[str], rows: List[List[Any]]) -> List[Tuple[str, str]]:
+    """
+    (question as written, clean_lower form) per question row; the second is what gets scored.
+    """
+    if not rows:
+        return []  # a blank row 1 ([] header) still has questions in column 0
 
-    header = [clean_text(x) for x in values[0]]
     q_i = find_question_col_index(header)
 
-    out: List[str] = []
-    for row in values[1:]:
+    out: List[Tuple[str, str]] = []
+    for row in rows:
         if q_i >= len(row):
             continue
         q = clean_text(row[q_i])
         if not q:
             continue
-        if clean_lower(q) in ("question", "questions"):
-            continue
-        out.append(q)
+        q_low = q.lower()  # already cleaned, so this is clean_lower(q)
+        if q_low not in _Q_HEADER_VALUES:
+            out.append((q, q_low))
 
     return out
 
 
-def get_or_create_reframed_sheet(unit_spreadsheet):
+def get_or_create_reframed_sheet(unit_spreadsheet, known_header: Optional[List[str]] = None):
     """
     Always enforce clean A1:C header like screenshot-1.
+    known_header: the tab's header if already fetched (skips re-reading row 1).
     """
     try:
         ws = unit_spreadsheet.worksheet(REFRAME_SHEET_NAME)
+        header = known_header if known_header is not None else ws.row_values(1)
+        existing_first3 = [clean_text(x) for x in header[:3]]
     except gspread.WorksheetNotFound:
         ws = unit_spreadsheet.add_worksheet(title=REFRAME_SHEET_NAME, rows=2000, cols=10)
-
-    existing = ws.row_values(1)
-    existing_first3 = [clean_text(x) for x in existing[:3]]
+        existing_first3 = []
 
     if existing_first3 != REFRAME_HEADER:
-        ws.clear()
-        ws.update("A1:C1", [REFRAME_HEADER])
+        # clear values + write header in one batchUpdate
+        unit_spreadsheet.batch_update({"requests": [
+            {"updateCells": {"range": {"sheetId": ws.id}, "fields": "userEnteredValue"}},
+            {"updateCells": {
+                "start": {"sheetId": ws.id, "rowIndex": 0, "columnIndex": 0},
+                "rows": [{"values": [{"userEnteredValue": {"stringValue": h}} for h in REFRAME_HEADER]}],
+                "fields": "userEnteredValue",
+            }},
+        ]})
 
     return ws
 
 
-def build_row_for_append(target_header: List[str], item: Dict[str, str]) -> List[str]:
-    q_val = clean_text(item.get("question", ""))
-    a_val = clean_text(item.get("answer", ""))
-    b_val = clean_text(item.get("bloom", ""))
-
-    header_first3 = [clean_text(h) for h in target_header[:3]]
-    if header_first3 == REFRAME_HEADER:
-        return [q_val, a_val, b_val]
+@functools.lru_cache(maxsize=64)
+def _header_cols(header: Tuple[str, ...]) -> Tuple[int, int, int, int]:
+    """
+    (row width, question col, answer col, bloom col) for a target header; -1 = no column.
+    Cached: every row appended to the same tab shares its header.
+    """
+    if [clean_text(h) for h in header[:3]] == REFRAME_HEADER:
+        return 3, 0, 1, 2
 
-    lowered = [clean_lower(h) for h in target_header]
-    row = [""] * len(target_header)
+    # first "answer" and first "bloom" column in a single scan
+    a_i = b_i = -1
+    for i, h in enumerate(header):
+        hl = clean_lower(h)
+        if a_i < 0 and "answer" in hl:
+            a_i = i
+        if b_i < 0 and "bloom" in hl:
+            b_i = i
 
-    q_i = find_question_col_index(target_header)
-    row[q_i] = q_val
+    return len(header), find_question_col_index(list(header)), a_i, b_i
 
-    for i, h in enumerate(lowered):
-        if "answer" in h:
-            row[i] = a_val
-            break
 
-    for i, h in enumerate(lowered):
-        if "bloom" in h:
-            row[i] = b_val
-            break
+def build_row_for_append(target_header: List[str], item: Dict[str, str]) -> List[str]:
+    width, q_i, a_i, b_i = _header_cols(tuple(target_header))
+
+    row = [""] * width
+    row[q_i] = clean_text(item.get("question", ""))
+    if a_i >= 0:
+        row[a_i] = clean_text(item.get("answer", ""))
+    if b_i >= 0:
+        row[b_i] = clean_text(item.get("bloom", ""))
 
     return row
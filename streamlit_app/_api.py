@@ -0,0 +1,32 @@
+import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
+
+# Shared HTTP session for all pages: keeps backend connections alive
+# across reruns and retries transient failures on idempotent calls.
+SESSION = requests.Session()
+
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False,  # hand the last response back to the page
+    ),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+
+def post_csv(url, uploaded_file, fields=None, timeout=180):
+    """
+    POST an uploaded CSV (plus form fields) as multipart/form-data.
+    The encoder reads the file in chunks while sending, so the whole
+    body is never built as one bytes object.
+    """
+    uploaded_file.seek(0)  # may have been read by an earlier rerun
+    m = MultipartEncoder(fields={**(fields or {}), "file": (uploaded_file.name, uploaded_file, "text/csv")})
+    return SESSION.post(url, data=m, headers={"Content-Type": m.content_type}, timeout=timeout)
@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
-import requests
-import tempfile
+import orjson
 import os
 
+from _api import SESSION, post_csv
+
 
 API_BASE = st.secrets.get("API_BASE_URL", os.getenv("API_BASE_URL", "https://vedprathap28-question-checker-backend.hf.space"))
 
 
+@st.cache_data(ttl=120)
+def fetch_assessments():
+    resp = SESSION.get(f"{API_BASE}/assessments", timeout=30)
+    resp.raise_for_status()
+    return orjson.loads(resp.content)
 
 st.set_page_config(page_title="Import Previous Papers", layout="wide")
 st.title("📥 Import Previous Papers")
@@ -27,25 +33,21 @@ if st.button("Import Previous Paper", type="primary"):
         st.error("⚠️ Please enter an assessment name.")
         st.stop()
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-        tmp.write(uploaded_file.getvalue())
-        file_path = tmp.name
-
     try:
-        with open(file_path, "rb") as f:
-            resp = requests.post(
-                f"{API_BASE}/import/assessment",
-                data={"assessment_name": assessment_name.strip()},
-                files={"file": f},
-                timeout=180
-            )
-
-        data = resp.json() if resp.text else {}
+        resp = post_csv(
+            f"{API_BASE}/import/assessment",
+            uploaded_file,
+            fields={"assessment_name": assessment_name.strip()},
+            timeout=180
+        )
+
+        data = orjson.loads(resp.content) if resp.content else {}
         if resp.status_code == 200:
             st.success("✅ Import completed!")
             st.json(data)
 
             # ✅ refresh list immediately (old behavior)
+            fetch_assessments.clear()
             st.rerun()
         else:
             st.error(f"❌ API error ({resp.status_code})")
@@ -53,18 +55,12 @@ if st.button("Import Previous Paper", type="primary"):
 
     except Exception as e:
         st.error(f"❌ Error while calling API: {e}")
-    finally:
-        try:
-            os.remove(file_path)
-        except Exception:
-            pass
 
 st.markdown("---")
 st.subheader("📚 Previously Imported Papers")
 
 try:
-    resp = requests.get(f"{API_BASE}/assessments", timeout=30)
-    assessments = resp.json() if resp.status_code == 200 else []
+    assessments = fetch_assessments()
 except Exception as e:
     st.error(f"❌ Could not load assessments: {e}")
     assessments = []
@@ -86,12 +82,12 @@ col1, col2 = st.columns([3, 1])
 with col1:
     if st.button("🔍 Show Details", use_container_width=True):
         try:
-            d_resp = requests.get(f"{API_BASE}/assessments/{selected_id}", timeout=60)
+            d_resp = SESSION.get(f"{API_BASE}/assessments/{selected_id}", timeout=60)
             if d_resp.status_code != 200:
                 st.error(f"❌ API error ({d_resp.status_code})")
                 st.write(d_resp.text)
             else:
-                d = d_resp.json()
+                d = orjson.loads(d_resp.content)
                 st.subheader(f"✅ {d.get('assessment_name', '')}")
                 q_df = pd.DataFrame(d.get("questions", []))
                 if not q_df.empty:
@@ -104,9 +100,10 @@ with col1:
 with col2:
     if st.button("🗑️ Delete This Paper", use_container_width=True):
         try:
-            del_resp = requests.delete(f"{API_BASE}/assessments/{selected_id}", timeout=60)
+            del_resp = SESSION.delete(f"{API_BASE}/assessments/{selected_id}", timeout=60)
             if del_resp.status_code == 200:
                 st.success("✅ Deleted successfully.")
+                fetch_assessments.clear()
                 st.rerun()
             else:
                 st.error(f"❌ Delete failed ({del_resp.status_code})")
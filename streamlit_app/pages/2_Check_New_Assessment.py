@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
-import requests
-import tempfile
+import numpy as np
+import orjson
 import os
 
+from _api import post_csv
+
 API_BASE = st.secrets.get("API_BASE_URL", os.getenv("API_BASE_URL", "https://vedprathap28-question-checker-backend.hf.space"))
 
 
@@ -18,13 +20,6 @@ Backend will extract questions automatically and compare against DB.
 assessment_name = st.text_input("Assessment Name", placeholder="e.g., Mid Exam - Set A")
 uploaded_file = st.file_uploader("Upload New Assessment CSV", type=["csv"])
 
-def tag(score):
-    if score >= 95:
-        return "🟢 Duplicate"
-    if score >= 50:
-        return "🟡 Reframed"
-    return "🔵 New"
-
 if st.button("Check Similarity", type="primary"):
     if not uploaded_file:
         st.error("⚠️ Please upload a CSV file.")
@@ -33,20 +28,15 @@ if st.button("Check Similarity", type="primary"):
         st.error("⚠️ Please enter an assessment name.")
         st.stop()
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-        tmp.write(uploaded_file.getvalue())
-        file_path = tmp.name
-
     try:
-        with open(file_path, "rb") as f:
-            response = requests.post(
-                f"{API_BASE}/check/new",
-                data={"assessment_name": assessment_name},
-                files={"file": f},
-                timeout=180
-            )
+        response = post_csv(
+            f"{API_BASE}/check/new",
+            uploaded_file,
+            fields={"assessment_name": assessment_name, "details_orient": "columns"},
+            timeout=180
+        )
 
-        result = response.json()
+        result = orjson.loads(response.content)
 
         if "error" in result:
             st.error(result["error"])
@@ -59,13 +49,13 @@ if st.button("Check Similarity", type="primary"):
 
         st.info(f"📌 Duplicate questions found within this uploaded paper: **{result.get('duplicates_within_uploaded_paper', 0)}**")
 
-        details = result.get("details", [])
-        df = pd.DataFrame(details)
+        df = pd.DataFrame(result.get("details") or {})  # columnar: {column: [values]}
         if df.empty:
             st.warning("No questions extracted.")
             st.stop()
 
-        df["Match"] = df["similarity_percentage"].apply(tag)
+        score = df["similarity_percentage"]
+        df["Match"] = np.select([score >= 95, score >= 50], ["🟢 Duplicate", "🟡 Reframed"], default="🔵 New")
 
         # ✅ show your required columns
         cols = [
@@ -81,7 +71,7 @@ if st.button("Check Similarity", type="primary"):
             "unit",
             "confidence",
         ]
-        df = df[[c for c in cols if c in df.columns]]
+        df = df.reindex(columns=[c for c in cols if c in df.columns])
 
         st.subheader("🧾 Results")
         st.dataframe(df, use_container_width=True)
@@ -90,8 +80,3 @@ if st.button("Check Similarity", type="primary"):
 
     except Exception as e:
         st.error(f"❌ Error occurred: {e}")
-    finally:
-        try:
-            os.remove(file_path)
-        except Exception:
-            pass
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import requests
-import tempfile
+import orjson
 import os
 
+from _api import post_csv
+
 API_BASE = st.secrets.get("API_BASE_URL", os.getenv("API_BASE_URL", "https://vedprathap28-question-checker-backend.hf.space"))
 
 st.set_page_config(page_title="Check in Master", layout="wide")
@@ -25,20 +26,15 @@ if st.button("Run Check in Master", type="primary"):
         st.error("Upload a CSV file first.")
         st.stop()
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-        tmp.write(uploaded_file.getvalue())
-        file_path = tmp.name
-
     try:
         with st.spinner("Working… updating unit sheets…"):
-            with open(file_path, "rb") as f:
-                resp = requests.post(
-                    f"{API_BASE}/check/master",
-                    files={"file": f},
-                    timeout=300
-                )
+            resp = post_csv(
+                f"{API_BASE}/check/master",
+                uploaded_file,
+                timeout=300
+            )
 
-        data = resp.json()
+        data = orjson.loads(resp.content)
 
         if resp.status_code != 200:
             st.error(f"Backend error: {resp.status_code}")
@@ -66,8 +62,3 @@ if st.button("Run Check in Master", type="primary"):
 
     except Exception as e:
         st.error(f"Backend did not return JSON / error: {e}")
-    finally:
-        try:
-            os.remove(file_path)
-        except Exception:
-            pass